@@ -1,8 +1,18 @@
 import csv
+import fnmatch
 import os
 import zipfile
 import io
-from flask import Flask, render_template, request, send_file, flash, redirect, url_for, jsonify
+import json
+import multiprocessing
+import re
+import shutil
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from flask import Flask, render_template, request, send_file, flash, redirect, url_for, jsonify, Response
 from werkzeug.utils import secure_filename
 from datetime import datetime
 
@@ -14,6 +24,13 @@ UPLOAD_FOLDER = 'uploads'
 OUTPUT_FOLDER = 'outputs'
 DATABASE_FILE = './Files/Database/classification_database.csv'
 ALLOWED_EXTENSIONS = {'csv'}
+BULK_MAX_IN_FLIGHT = 4  # Number of bulk scan worker processes (files processed in parallel)
+SESSION_TTL_SECONDS = 24 * 60 * 60  # Sessions older than this are evicted
+EVICTION_INTERVAL_SECONDS = 10 * 60  # How often the eviction thread runs
+BULK_JOB_TTL_SECONDS = 10 * 60  # Bulk scans whose progress stream never opened are dropped after this
+MANIFEST_FILE = 'manifest.json'
+PATTERN_TYPES = {'substring', 'prefix', 'suffix', 'glob', 'regex'}
+LITERAL_AUTOMATON_THRESHOLD = 64  # Below this many literal patterns a plain loop is faster than the automaton
 
 # Create necessary folders
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
@@ -22,6 +39,21 @@ os.makedirs(OUTPUT_FOLDER, exist_ok=True)
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['OUTPUT_FOLDER'] = OUTPUT_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = 2 * 1024 * 1024 * 1024  # 2GB max file size
+app.config['BULK_MAX_IN_FLIGHT'] = BULK_MAX_IN_FLIGHT
+app.config['SESSION_TTL_SECONDS'] = SESSION_TTL_SECONDS
+app.config['EVICTION_INTERVAL_SECONDS'] = EVICTION_INTERVAL_SECONDS
+app.config['BULK_JOB_TTL_SECONDS'] = BULK_JOB_TTL_SECONDS
+
+# Pending bulk scans, keyed by session ID, waiting for their progress stream
+bulk_jobs = {}
+bulk_jobs_lock = threading.Lock()
+
+# Manifests of sessions still being written, keyed by session ID. Each has its own lock
+# and is written to disk once, when the session is closed.
+open_manifests = {}
+open_manifests_lock = threading.Lock()
+
+SESSION_ID_RE = re.compile(r'[A-Za-z0-9_]+')
 
 
 def allowed_file(filename):
@@ -29,30 +61,424 @@ def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
-def load_classification_database():
-    """Load the classification database from CSV file."""
+def new_session_id():
+    """Generate a unique, timestamp-prefixed session ID."""
+    return f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+
+
+def session_folder(base_folder, session_id, create=False):
+    """Return the per-session directory inside base_folder, or None for an invalid session ID."""
+    if not session_id or not SESSION_ID_RE.fullmatch(session_id):
+        return None
+    
+    folder = os.path.join(base_folder, session_id)
+    if create:
+        os.makedirs(folder, exist_ok=True)
+    return folder
+
+
+def load_manifest_file(session_id):
+    """Load the output manifest of a session from disk, or None if it has not been written."""
+    folder = session_folder(app.config['OUTPUT_FOLDER'], session_id)
+    if folder is None:
+        return None
+    
+    manifest_path = os.path.join(folder, MANIFEST_FILE)
+    try:
+        with open(manifest_path, encoding='utf-8') as manifest_file:
+            return json.load(manifest_file)
+    except (OSError, ValueError):
+        return None
+
+
+def read_manifest(session_id):
+    """Return the output manifest of a session, or None if the session does not exist."""
+    with open_manifests_lock:
+        entry = open_manifests.get(session_id)
+    
+    if entry is None:
+        return load_manifest_file(session_id)
+    
+    # Snapshot the in-memory manifest so callers can iterate it while workers keep adding files
+    with entry['lock']:
+        manifest = entry['manifest']
+        return {**manifest, 'files': dict(manifest['files'])}
+
+
+def write_manifest(session_id, manifest):
+    """Atomically replace the output manifest of a session."""
+    folder = session_folder(app.config['OUTPUT_FOLDER'], session_id, create=True)
+    manifest_path = os.path.join(folder, MANIFEST_FILE)
+    temp_path = f"{manifest_path}.{threading.get_ident()}.tmp"
+    
+    with open(temp_path, 'w', encoding='utf-8') as manifest_file:
+        json.dump(manifest, manifest_file)
+    os.replace(temp_path, manifest_path)
+
+
+def output_path_for(session_id, file_name):
+    """Return the path an output file of a session is written to."""
+    folder = session_folder(app.config['OUTPUT_FOLDER'], session_id, create=True)
+    if folder is None:
+        raise ValueError(f'Invalid session ID: {session_id}')
+    return os.path.join(folder, file_name)
+
+
+def open_manifest(session_id):
+    """Return the in-memory manifest entry of a session, loading or creating it on first use."""
+    with open_manifests_lock:
+        entry = open_manifests.get(session_id)
+        if entry is None:
+            manifest = load_manifest_file(session_id) or {
+                'session_id': session_id,
+                'created': time.time(),
+                'files': {}
+            }
+            entry = {
+                'lock': threading.Lock(),
+                'manifest': manifest,
+                'updated': time.time(),
+                'closed': False
+            }
+            open_manifests[session_id] = entry
+        return entry
+
+
+def record_output(session_id, file_name, kind, stats=None):
+    """Add a finished output file of a session to its in-memory manifest."""
+    file_path = output_path_for(session_id, file_name)
+    size = os.path.getsize(file_path)
+    
+    while True:
+        entry = open_manifest(session_id)
+        with entry['lock']:
+            # The session was closed while we waited; record into a freshly loaded entry instead
+            if entry['closed']:
+                continue
+            
+            entry['manifest']['files'][file_name] = {
+                'kind': kind,
+                'size': size,
+                'stats': stats,
+                'created': time.time()
+            }
+            entry['updated'] = time.time()
+            return
+
+
+def close_manifest(session_id, write=True):
+    """Stop tracking a session's manifest in memory, writing it to disk unless write is False."""
+    # Hold the registry lock while writing so no one reloads a half-written manifest
+    with open_manifests_lock:
+        entry = open_manifests.pop(session_id, None)
+        if entry is None:
+            return
+        
+        with entry['lock']:
+            entry['closed'] = True
+            if write:
+                write_manifest(session_id, entry['manifest'])
+
+
+def flush_idle_manifests():
+    """Write out and close manifests that have not been updated for an eviction interval."""
+    cutoff = time.time() - app.config['EVICTION_INTERVAL_SECONDS']
+    
+    with open_manifests_lock:
+        idle = [session_id for session_id, entry in open_manifests.items() if entry['updated'] < cutoff]
+    
+    for session_id in idle:
+        close_manifest(session_id)
+    return len(idle)
+
+
+def session_outputs(session_id, kind):
+    """Return (file name, path) pairs of a session's outputs of the given kind, from its manifest."""
+    manifest = read_manifest(session_id)
+    if manifest is None:
+        return []
+    
+    folder = session_folder(app.config['OUTPUT_FOLDER'], session_id)
+    return [(file_name, os.path.join(folder, file_name))
+            for file_name, entry in sorted(manifest['files'].items())
+            if entry['kind'] == kind]
+
+
+def find_output(session_id, file_name):
+    """Return the path of a session output listed in its manifest, or None."""
+    manifest = read_manifest(session_id)
+    if manifest is None or file_name not in manifest['files']:
+        return None
+    
+    file_path = os.path.join(session_folder(app.config['OUTPUT_FOLDER'], session_id), file_name)
+    return file_path if os.path.exists(file_path) else None
+
+
+def remove_session(session_id):
+    """Delete a session's output and upload directories, returning the number of files removed."""
+    close_manifest(session_id, write=False)
+    
+    removed = 0
+    for base_folder in (app.config['OUTPUT_FOLDER'], app.config['UPLOAD_FOLDER']):
+        folder = session_folder(base_folder, session_id)
+        if folder is None or not os.path.isdir(folder):
+            continue
+        removed += len([f for f in os.listdir(folder) if f != MANIFEST_FILE])
+        shutil.rmtree(folder, ignore_errors=True)
+    return removed
+
+
+def clear_folder(base_folder):
+    """Delete every session directory (and any loose CSV file) in base_folder, returning the number of files removed."""
+    deleted_count = 0
+    
+    with os.scandir(base_folder) as entries:
+        for entry in entries:
+            try:
+                if entry.is_dir():
+                    if base_folder == app.config['OUTPUT_FOLDER']:
+                        close_manifest(entry.name, write=False)
+                    deleted_count += len([f for f in os.listdir(entry.path) if f != MANIFEST_FILE])
+                    shutil.rmtree(entry.path)
+                elif entry.name.endswith('.csv'):
+                    os.remove(entry.path)
+                    deleted_count += 1
+            except Exception as e:
+                print(f"Error deleting {entry.name}: {str(e)}")
+    
+    return deleted_count
+
+
+def evict_expired_sessions():
+    """Remove sessions whose manifest is older than the configured TTL."""
+    cutoff = time.time() - app.config['SESSION_TTL_SECONDS']
+    evicted = 0
+    
+    for base_folder in (app.config['OUTPUT_FOLDER'], app.config['UPLOAD_FOLDER']):
+        with os.scandir(base_folder) as entries:
+            for entry in entries:
+                if not entry.is_dir() or not SESSION_ID_RE.fullmatch(entry.name):
+                    continue
+                
+                # Outputs carry their creation time in the manifest; uploads fall back to the directory mtime
+                manifest = read_manifest(entry.name)
+                if manifest is not None:
+                    created = manifest.get('created', 0)
+                else:
+                    created = entry.stat().st_mtime
+                
+                if created < cutoff:
+                    remove_session(entry.name)
+                    evicted += 1
+    
+    if evicted:
+        print(f"Evicted {evicted} expired session(s)")
+    return evicted
+
+
+def evict_stale_bulk_jobs():
+    """Drop registered bulk scans whose progress stream was never opened."""
+    cutoff = time.time() - app.config['BULK_JOB_TTL_SECONDS']
+    
+    with bulk_jobs_lock:
+        stale = [session_id for session_id, job in bulk_jobs.items() if job['registered'] < cutoff]
+        for session_id in stale:
+            del bulk_jobs[session_id]
+    
+    if stale:
+        print(f"Dropped {len(stale)} abandoned bulk scan(s)")
+    return len(stale)
+
+
+def eviction_loop():
+    """Background loop that periodically evicts expired sessions and abandoned bulk scans."""
+    while True:
+        time.sleep(app.config['EVICTION_INTERVAL_SECONDS'])
+        try:
+            evict_stale_bulk_jobs()
+            flush_idle_manifests()
+            evict_expired_sessions()
+        except Exception as e:
+            print(f"Error evicting sessions: {str(e)}")
+
+
+# Bulk scan worker processes re-import this module on spawn-based platforms; only the server evicts
+if multiprocessing.parent_process() is None:
+    threading.Thread(target=eviction_loop, name='session-eviction', daemon=True).start()
+
+
+def load_classification_database(database_file=None):
+    """Load the classification database from CSV file and compile its patterns."""
+    database_file = database_file or DATABASE_FILE
     classifications = []
     
-    if not os.path.exists(DATABASE_FILE):
-        return classifications
+    if not os.path.exists(database_file):
+        return compile_classifications(classifications)
     
-    with open(DATABASE_FILE, newline='', encoding="utf-8") as db_file:
+    with open(database_file, newline='', encoding="utf-8") as db_file:
         reader = csv.DictReader(db_file)
         for row in reader:
+            # Databases without a pattern_type column keep plain substring matching
+            pattern_type = (row.get('pattern_type') or 'substring').strip().lower()
+            
+            if pattern_type not in PATTERN_TYPES:
+                print(f"WARNING: Skipping pattern '{row['file_pattern']}' with unknown type '{pattern_type}'")
+                continue
+            
             classifications.append({
                 'pattern': row['file_pattern'],
+                'pattern_type': pattern_type,
                 'comments': row['comments'],
                 'status': row['status']
             })
     
-    return classifications
+    return compile_classifications(classifications)
+
+
+def compile_pattern(pattern, pattern_type):
+    """Compile a glob or regex database pattern into a function that tests a filename."""
+    if pattern_type == 'glob':
+        return re.compile(fnmatch.translate(pattern)).match
+    return re.compile(pattern, re.DOTALL).search
+
+
+def build_literal_automaton(literals):
+    """Build an Aho-Corasick automaton over (text, index, pattern type) literal patterns.
+    
+    Returns (goto, fail, out) lists indexed by state. out[state] holds the
+    (index, pattern type, length) of every literal ending in that state.
+    """
+    goto = [{}]
+    fail = [0]
+    out = [[]]
+    
+    for text, index, pattern_type in literals:
+        state = 0
+        for ch in text:
+            next_state = goto[state].get(ch)
+            if next_state is None:
+                next_state = len(goto)
+                goto[state][ch] = next_state
+                goto.append({})
+                fail.append(0)
+                out.append([])
+            state = next_state
+        out[state].append((index, pattern_type, len(text)))
+    
+    # Breadth-first pass to fill in failure links and inherited outputs
+    pending = deque(goto[0].values())
+    while pending:
+        state = pending.popleft()
+        for ch, next_state in goto[state].items():
+            pending.append(next_state)
+            
+            fallback = fail[state]
+            while fallback and ch not in goto[fallback]:
+                fallback = fail[fallback]
+            fail[next_state] = goto[fallback].get(ch, 0)
+            out[next_state] = out[next_state] + out[fail[next_state]]
+    
+    return goto, fail, out
+
+
+def compile_classifications(classifications):
+    """Compile all database patterns for classification.
+    
+    Substring, prefix and suffix patterns share one Aho-Corasick automaton (or a
+    plain loop for small databases, where that is faster). Glob and regex
+    patterns are compiled one by one and tried in database order, which beats a
+    combined alternation regex at every size measured. The match with the
+    lowest database index wins, as before.
+    """
+    patterns = []
+    literals = []
+    regexes = []
+    
+    for item in classifications:
+        index = len(patterns)
+        
+        if item['pattern_type'] in ('glob', 'regex'):
+            # A bad regex only skips its own row, never the whole database
+            try:
+                regexes.append((index, compile_pattern(item['pattern'], item['pattern_type'])))
+            except re.error as e:
+                print(f"WARNING: Skipping invalid {item['pattern_type']} pattern '{item['pattern']}': {str(e)}")
+                continue
+        else:
+            literals.append((item['pattern'], index, item['pattern_type']))
+        
+        patterns.append(item)
+    
+    return {
+        'patterns': patterns,
+        'literals': literals,
+        'automaton': build_literal_automaton(literals) if len(literals) >= LITERAL_AUTOMATON_THRESHOLD else None,
+        'regexes': regexes
+    }
+
+
+def match_literals(file_name, automaton):
+    """Return the lowest database index of a substring, prefix or suffix pattern matching the filename."""
+    goto, fail, out = automaton
+    last_pos = len(file_name) - 1
+    best = None
+    
+    # Empty patterns live on the root state and match every filename
+    for index, pattern_type, length in out[0]:
+        if best is None or index < best:
+            best = index
+    
+    state = 0
+    for pos, ch in enumerate(file_name):
+        while state and ch not in goto[state]:
+            state = fail[state]
+        state = goto[state].get(ch, 0)
+        
+        for index, pattern_type, length in out[state]:
+            if best is not None and index >= best:
+                continue
+            if pattern_type == 'prefix' and pos + 1 != length:
+                continue
+            if pattern_type == 'suffix' and pos != last_pos:
+                continue
+            best = index
+    
+    return best
 
 
 def classify_file(file_name, classifications):
     """Match filename against database patterns and return classification."""
-    for item in classifications:
-        if item['pattern'] in file_name:
-            return item['comments'], item['status']
+    automaton = classifications['automaton']
+    best = None
+    
+    if automaton is not None:
+        best = match_literals(file_name, automaton)
+    else:
+        # Small databases: a plain loop in database order beats walking the automaton
+        for text, index, pattern_type in classifications['literals']:
+            if pattern_type == 'substring':
+                if text in file_name:
+                    best = index
+                    break
+            elif pattern_type == 'prefix':
+                if file_name.startswith(text):
+                    best = index
+                    break
+            elif file_name.endswith(text):
+                best = index
+                break
+    
+    # Glob and regex rows are in database order; only those that could outrank the literal match are tried
+    for index, matches in classifications['regexes']:
+        if best is not None and index > best:
+            break
+        if matches(file_name):
+            best = index
+            break
+    
+    if best is not None:
+        item = classifications['patterns'][best]
+        return item['comments'], item['status']
     
     return "", "Not Found"
 
@@ -130,25 +556,28 @@ def upload_file():
     try:
         # Secure the filename
         filename = secure_filename(file.filename)
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        session_id = new_session_id()
         
         # Save uploaded file
-        input_path = os.path.join(app.config['UPLOAD_FOLDER'], f"{timestamp}_{filename}")
+        upload_folder = session_folder(app.config['UPLOAD_FOLDER'], session_id, create=True)
+        input_path = os.path.join(upload_folder, filename)
         file.save(input_path)
         
         # Generate output filename with "Reviewed_" prefix
         output_filename = f"Reviewed_{filename}"
-        output_path = os.path.join(app.config['OUTPUT_FOLDER'], f"{timestamp}_{output_filename}")
+        output_path = output_path_for(session_id, output_filename)
         
         # Process the file
         stats = process_scan_file(input_path, output_path)
+        record_output(session_id, output_filename, 'reviewed', stats)
+        close_manifest(session_id)
         
         # Clean up uploaded file (optional - remove if you want to keep uploads)
         # os.remove(input_path)
         
         return render_template('result.html', 
                              filename=output_filename,
-                             download_path=f"{timestamp}_{output_filename}",
+                             download_path=f"{session_id}/{output_filename}",
                              stats=stats)
     
     except Exception as e:
@@ -156,22 +585,19 @@ def upload_file():
         return redirect(url_for('index'))
 
 
-@app.route('/download/<filename>')
-def download_file(filename):
+@app.route('/download/<session_id>/<filename>')
+def download_file(session_id, filename):
     """Handle file download."""
     try:
-        file_path = os.path.join(app.config['OUTPUT_FOLDER'], filename)
+        file_path = find_output(session_id, filename)
         
-        if not os.path.exists(file_path):
+        if file_path is None:
             flash('File not found', 'error')
             return redirect(url_for('index'))
         
-        # Get the original filename without timestamp
-        original_filename = '_'.join(filename.split('_')[2:]) if filename.count('_') >= 2 else filename
-        
         return send_file(file_path, 
                         as_attachment=True, 
-                        download_name=original_filename,
+                        download_name=filename,
                         mimetype='text/csv')
     
     except Exception as e:
@@ -208,13 +634,22 @@ def bulk_scan():
         print(f"Files: {csv_files}")
         
         # Generate a unique session ID for this bulk scan
-        session_id = datetime.now().strftime('%Y%m%d_%H%M%S')
+        session_id = new_session_id()
+        
+        # Register the job so the progress stream can pick it up
+        with bulk_jobs_lock:
+            bulk_jobs[session_id] = {
+                'folder_path': folder_path,
+                'csv_files': csv_files,
+                'registered': time.time()
+            }
         
         # Return the processing page with file list
         return render_template('bulk_processing.html', 
                              folder_path=folder_path,
                              csv_files=csv_files,
-                             session_id=session_id)
+                             session_id=session_id,
+                             max_in_flight=app.config['BULK_MAX_IN_FLIGHT'])
     
     except Exception as e:
         print(f"Error in bulk_scan: {str(e)}")
@@ -222,88 +657,117 @@ def bulk_scan():
         return redirect(url_for('index'))
 
 
-@app.route('/process_single_file', methods=['POST'])
-def process_single_file():
-    """Process a single file and return statistics."""
-    try:
-        data = request.get_json()
-        folder_path = data.get('folder_path', '')
-        file_name = data.get('file_name', '')
-        session_id = data.get('session_id', '')
-        
-        print(f"\n=== Processing Single File Request ===")
-        print(f"File name: {file_name}")
-        print(f"Folder path: {folder_path}")
-        print(f"Session ID: {session_id}")
-        print(f"Folder path type: {type(folder_path)}")
-        
-        if not folder_path or not file_name or not session_id:
-            print("ERROR: Missing parameters")
-            return jsonify({
-                'error': 'Missing parameters',
-                'true_positive': 0,
-                'false_positive': 0,
-                'not_found': 0,
-                'total': 0
-            }), 400
-        
-        file_path = os.path.join(folder_path, file_name)
-        print(f"Constructed file path: {file_path}")
-        print(f"File path exists: {os.path.exists(file_path)}")
-        print(f"Is file: {os.path.isfile(file_path)}")
-        
-        if not os.path.exists(file_path):
-            print(f"ERROR: File not found at: {file_path}")
-            print(f"Folder exists: {os.path.exists(folder_path)}")
-            if os.path.exists(folder_path):
-                print(f"Files in folder: {os.listdir(folder_path)}")
-            return jsonify({
-                'error': f'File not found: {file_path}',
-                'true_positive': 0,
-                'false_positive': 0,
-                'not_found': 0,
-                'total': 0
-            }), 404
-        
-        # Load classification database
-        classifications = load_classification_database()
-        print(f"Loaded {len(classifications)} classifications from database")
-        
-        # Create output filename with session ID
-        output_filename = f"{session_id}_Reviewed_{file_name}"
-        output_path = os.path.join(app.config['OUTPUT_FOLDER'], output_filename)
-        
-        # Process the file and save reviewed version
-        print(f"Processing CSV file: {file_path}")
-        stats = process_csv_and_save(file_path, output_path, classifications)
-        
-        print(f"Processing complete for {file_name}")
-        print(f"Saved reviewed file: {output_path}")
-        print(f"Results: {stats}")
-        
-        # Ensure all required fields are present
-        response = {
-            'true_positive': stats.get('true_positive', 0),
-            'false_positive': stats.get('false_positive', 0),
-            'not_found': stats.get('not_found', 0),
-            'total': stats.get('total', 0),
-            'success': True
-        }
+# Compiled classification database of a bulk scan worker process
+worker_classifications = None
+
+
+def init_bulk_worker(database_file):
+    """Compile the classification database once per bulk scan worker process."""
+    global worker_classifications
+    worker_classifications = load_classification_database(database_file)
+
+
+def review_bulk_file(file_path, output_path):
+    """Process one file of a bulk scan in a worker process, save its reviewed version, and return statistics."""
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f'File not found: {file_path}')
+    
+    return process_csv_and_save(file_path, output_path, worker_classifications)
+
+
+def format_sse(event, data):
+    """Format a Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.route('/bulk_progress/<session_id>', methods=['GET'])
+def bulk_progress(session_id):
+    """Process a registered bulk scan in parallel and stream per-file statistics as Server-Sent Events."""
+    with bulk_jobs_lock:
+        job = bulk_jobs.pop(session_id, None)
+    
+    if job is None:
+        return jsonify({'error': 'Unknown or already started bulk scan session'}), 404
+    
+    # Number of files in flight, capped by the server configuration
+    max_in_flight = app.config['BULK_MAX_IN_FLIGHT']
+    in_flight = request.args.get('in_flight', max_in_flight, type=int)
+    in_flight = max(1, min(in_flight, max_in_flight))
+    
+    folder_path = job['folder_path']
+    csv_files = job['csv_files']
+    
+    print(f"\n=== Streaming Bulk Scan {session_id} ===")
+    print(f"Files: {len(csv_files)}, in flight: {in_flight}")
+    
+    def generate():
+        # Worker processes sidestep the GIL, so files really are classified in parallel
+        executor = ProcessPoolExecutor(max_workers=in_flight,
+                                       initializer=init_bulk_worker,
+                                       initargs=(DATABASE_FILE,))
+        pending_files = list(enumerate(csv_files))
+        running = {}
+        
+        def submit_next():
+            # Only in_flight files are submitted at a time, so a submitted file is a started file
+            index, file_name = pending_files.pop(0)
+            output_filename = f"Reviewed_{file_name}"
+            future = executor.submit(review_bulk_file,
+                                     os.path.join(folder_path, file_name),
+                                     output_path_for(session_id, output_filename))
+            running[future] = (index, file_name, output_filename)
+            return format_sse('start', {'index': index, 'file_name': file_name})
+        
+        def finish(future):
+            index, file_name, output_filename = running.pop(future)
+            try:
+                stats = future.result()
+                record_output(session_id, output_filename, 'reviewed', stats)
+                return format_sse('file', {
+                    'index': index,
+                    'file_name': file_name,
+                    'true_positive': stats.get('true_positive', 0),
+                    'false_positive': stats.get('false_positive', 0),
+                    'not_found': stats.get('not_found', 0),
+                    'total': stats.get('total', 0),
+                    'success': True
+                })
+            except Exception as e:
+                print(f"Error processing {file_name}: {str(e)}")
+                return format_sse('file', {
+                    'index': index,
+                    'file_name': file_name,
+                    'error': str(e),
+                    'success': False
+                })
         
-        return jsonify(response)
+        try:
+            yield format_sse('begin', {'total_files': len(csv_files), 'in_flight': in_flight})
+            
+            while pending_files and len(running) < in_flight:
+                yield submit_next()
+            
+            while running:
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield finish(future)
+                    if pending_files:
+                        yield submit_next()
+            
+            print(f"Bulk scan {session_id} complete")
+            yield format_sse('done', {'total_files': len(csv_files)})
+        finally:
+            # Client went away or stream finished - files not yet submitted are never started,
+            # and the at most in_flight running ones are waited for so the manifest lists them
+            for future in list(running):
+                wait([future])
+                finish(future)
+            executor.shutdown()
+            
+            close_manifest(session_id)
     
-    except Exception as e:
-        print(f"Error processing file: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        return jsonify({
-            'error': str(e),
-            'true_positive': 0,
-            'false_positive': 0,
-            'not_found': 0,
-            'total': 0,
-            'success': False
-        }), 500
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 
 def process_csv_for_bulk(file_path, classifications):
@@ -383,9 +847,8 @@ def process_csv_and_save(input_path, output_path, classifications):
 def download_bulk_results(session_id):
     """Download all reviewed files from a bulk scan as a zip file."""
     try:
-        # Find all files for this session
-        output_files = [f for f in os.listdir(app.config['OUTPUT_FOLDER']) 
-                       if f.startswith(f"{session_id}_Reviewed_") and f.endswith('.csv')]
+        # Find all files for this session from its manifest
+        output_files = session_outputs(session_id, 'reviewed')
         
         if not output_files:
             flash('No reviewed files found for this session', 'error')
@@ -394,11 +857,8 @@ def download_bulk_results(session_id):
         # Create zip file in memory
         memory_file = io.BytesIO()
         with zipfile.ZipFile(memory_file, 'w', zipfile.ZIP_DEFLATED) as zf:
-            for file_name in output_files:
-                file_path = os.path.join(app.config['OUTPUT_FOLDER'], file_name)
-                # Add file to zip with cleaner name (remove session ID prefix)
-                clean_name = file_name.replace(f"{session_id}_", "")
-                zf.write(file_path, clean_name)
+            for file_name, file_path in output_files:
+                zf.write(file_path, file_name)
         
         memory_file.seek(0)
         
@@ -423,14 +883,13 @@ def download_single_result(session_id, file_name):
     """Download a single reviewed file from a bulk scan."""
     try:
         # Construct the reviewed filename
-        reviewed_filename = f"{session_id}_Reviewed_{file_name}"
-        file_path = os.path.join(app.config['OUTPUT_FOLDER'], reviewed_filename)
+        reviewed_filename = f"Reviewed_{file_name}"
+        file_path = find_output(session_id, reviewed_filename)
         
-        print(f"Download request for: {reviewed_filename}")
-        print(f"File path: {file_path}")
+        print(f"Download request for: {session_id}/{reviewed_filename}")
         
-        if not os.path.exists(file_path):
-            print(f"ERROR: File not found: {file_path}")
+        if file_path is None:
+            print(f"ERROR: File not found: {session_id}/{reviewed_filename}")
             flash('Reviewed file not found', 'error')
             return redirect(url_for('index'))
         
@@ -454,25 +913,12 @@ def download_single_result(session_id, file_name):
 def cleanup_outputs():
     """Delete all reviewed files from the outputs folder."""
     try:
-        output_folder = app.config['OUTPUT_FOLDER']
+        deleted_count = clear_folder(app.config['OUTPUT_FOLDER'])
         
-        # Get all CSV files in outputs folder
-        files = [f for f in os.listdir(output_folder) if f.endswith('.csv')]
-        
-        if not files:
+        if not deleted_count:
             flash('No files to clean up', 'info')
             return redirect(url_for('index'))
         
-        # Delete each file
-        deleted_count = 0
-        for file_name in files:
-            file_path = os.path.join(output_folder, file_name)
-            try:
-                os.remove(file_path)
-                deleted_count += 1
-            except Exception as e:
-                print(f"Error deleting {file_name}: {str(e)}")
-        
         print(f"Cleanup complete: Deleted {deleted_count} file(s) from outputs")
         flash(f'Successfully deleted {deleted_count} reviewed file(s)', 'success')
         return redirect(url_for('index'))
@@ -489,25 +935,12 @@ def cleanup_outputs():
 def cleanup_uploads():
     """Delete all uploaded files from the uploads folder."""
     try:
-        upload_folder = app.config['UPLOAD_FOLDER']
+        deleted_count = clear_folder(app.config['UPLOAD_FOLDER'])
         
-        # Get all CSV files in uploads folder
-        files = [f for f in os.listdir(upload_folder) if f.endswith('.csv')]
-        
-        if not files:
+        if not deleted_count:
             flash('No files to clean up', 'info')
             return redirect(url_for('index'))
         
-        # Delete each file
-        deleted_count = 0
-        for file_name in files:
-            file_path = os.path.join(upload_folder, file_name)
-            try:
-                os.remove(file_path)
-                deleted_count += 1
-            except Exception as e:
-                print(f"Error deleting {file_name}: {str(e)}")
-        
         print(f"Cleanup complete: Deleted {deleted_count} file(s) from uploads")
         flash(f'Successfully deleted {deleted_count} uploaded file(s)', 'success')
         return redirect(url_for('index'))
@@ -540,10 +973,11 @@ def split_csv():
     try:
         # Secure the filename
         filename = secure_filename(file.filename)
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        session_id = new_session_id()
         
         # Save uploaded file temporarily
-        temp_input_path = os.path.join(app.config['UPLOAD_FOLDER'], f"{timestamp}_{filename}")
+        upload_folder = session_folder(app.config['UPLOAD_FOLDER'], session_id, create=True)
+        temp_input_path = os.path.join(upload_folder, filename)
         file.save(temp_input_path)
         
         # Count rows in the CSV
@@ -554,18 +988,19 @@ def split_csv():
         # Check if splitting is needed
         if row_count <= 1000000:
             # No splitting needed - just inform the user
-            os.remove(temp_input_path)  # Clean up temp file
+            shutil.rmtree(upload_folder, ignore_errors=True)  # Clean up temp file
             flash(f'File has {row_count:,} rows. No splitting needed (threshold: 1 million rows).', 'info')
             return redirect(url_for('index'))
         
         # Split the CSV file
-        split_files = split_csv_file(temp_input_path, filename, timestamp)
+        split_files = split_csv_file(temp_input_path, filename, session_id)
         
         # Clean up temp file
-        os.remove(temp_input_path)
+        shutil.rmtree(upload_folder, ignore_errors=True)
         
         # Create result data
         result_data = {
+            'session_id': session_id,
             'original_filename': filename,
             'total_rows': row_count,
             'split_files': split_files,
@@ -592,7 +1027,7 @@ def count_csv_rows(file_path):
     return row_count
 
 
-def split_csv_file(input_path, original_filename, timestamp, chunk_size=1000000):
+def split_csv_file(input_path, original_filename, session_id, chunk_size=1000000):
     """Split a CSV file into chunks of specified size."""
     split_files = []
     
@@ -612,11 +1047,12 @@ def split_csv_file(input_path, original_filename, timestamp, chunk_size=1000000)
                 # Close previous file if exists
                 if current_file:
                     current_file.close()
+                    record_output(session_id, current_filename, 'split')
                 
                 # Create new file
                 base_name = original_filename.rsplit('.', 1)[0]
-                current_filename = f"{timestamp}_Split_{file_num}_{base_name}.csv"
-                output_path = os.path.join(app.config['OUTPUT_FOLDER'], current_filename)
+                current_filename = f"Split_{file_num}_{base_name}.csv"
+                output_path = output_path_for(session_id, current_filename)
                 
                 current_file = open(output_path, 'w', newline='', encoding='utf-8')
                 current_writer = csv.DictWriter(current_file, fieldnames=fieldnames)
@@ -636,30 +1072,25 @@ def split_csv_file(input_path, original_filename, timestamp, chunk_size=1000000)
         # Close the last file
         if current_file:
             current_file.close()
+            record_output(session_id, current_filename, 'split')
     
+    close_manifest(session_id)
     return split_files
 
 
-@app.route('/download_split/<filename>')
-def download_split_file(filename):
+@app.route('/download_split/<session_id>/<filename>')
+def download_split_file(session_id, filename):
     """Download a split CSV file."""
     try:
-        file_path = os.path.join(app.config['OUTPUT_FOLDER'], filename)
+        file_path = find_output(session_id, filename)
         
-        if not os.path.exists(file_path):
+        if file_path is None:
             flash('File not found', 'error')
             return redirect(url_for('index'))
         
-        # Clean filename for download (remove timestamp prefix)
-        parts = filename.split('_')
-        if len(parts) >= 4:
-            clean_name = '_'.join(parts[3:])
-        else:
-            clean_name = filename
-        
         return send_file(file_path, 
                         as_attachment=True, 
-                        download_name=clean_name,
+                        download_name=filename,
                         mimetype='text/csv')
     
     except Exception as e:
@@ -671,9 +1102,8 @@ def download_split_file(filename):
 def download_all_splits(session_id):
     """Download all split files as a zip."""
     try:
-        # Find all split files for this session
-        split_files = [f for f in os.listdir(app.config['OUTPUT_FOLDER']) 
-                      if f.startswith(f"{session_id}_Split_") and f.endswith('.csv')]
+        # Find all split files for this session from its manifest
+        split_files = session_outputs(session_id, 'split')
         
         if not split_files:
             flash('No split files found for this session', 'error')
@@ -682,12 +1112,8 @@ def download_all_splits(session_id):
         # Create zip file in memory
         memory_file = io.BytesIO()
         with zipfile.ZipFile(memory_file, 'w', zipfile.ZIP_DEFLATED) as zf:
-            for file_name in split_files:
-                file_path = os.path.join(app.config['OUTPUT_FOLDER'], file_name)
-                # Clean up filename in zip
-                parts = file_name.split('_')
-                clean_name = '_'.join(parts[3:]) if len(parts) >= 4 else file_name
-                zf.write(file_path, clean_name)
+            for file_name, file_path in split_files:
+                zf.write(file_path, file_name)
         
         memory_file.seek(0)
         